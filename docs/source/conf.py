@@ -3,10 +3,21 @@
 # SPDX-FileType: SOURCE
 
 # Python imports
+import concurrent.futures
 import datetime
 import os
+import pathlib
+import re
 import subprocess
 import sys
+import time
+import urllib.request
+
+# Resolve the relevant directories exactly once at import. All paths derived
+# from these are absolute, independent of the current working directory of the
+# sphinx-build process.
+CONF_DIR = pathlib.Path(__file__).resolve().parent
+REPO_ROOT = CONF_DIR.parents[1]
 
 
 def generate_doxygen_xml(app):
@@ -14,6 +25,14 @@ def generate_doxygen_xml(app):
 
     The function is adapted from the official documentation of ``breathe``, see
     https://breathe.readthedocs.io/en/latest/readthedocs.html.
+
+    ``doxygen`` is only actually run if any of its input files (the C sources
+    and headers below ``src/`` or the ``Doxyfile`` itself) was modified after
+    the previous run, as tracked by a stamp file in the XML output directory.
+    Pre-existing XML without a stamp (e.g. restored from ReadTheDocs' cached
+    build image) is re-used as-is. On unchanged rebuilds the whole external
+    tool invocation is skipped. Setting ``FORCE_DOXYGEN=1`` in the
+    environment bypasses all short-circuits and rebuilds unconditionally.
     """
 
     read_the_docs_build = os.environ.get("READTHEDOCS", None) == "True"
@@ -21,30 +40,75 @@ def generate_doxygen_xml(app):
     if not read_the_docs_build:
         return
 
+    xml_dir = pathlib.Path(breathe_projects["Krachkiste_ESP32"])
+    stamp_file = xml_dir / ".stamp"
+
+    force_doxygen = os.environ.get("FORCE_DOXYGEN", None) == "1"
+
+    if not force_doxygen:
+        # XML from a previous build that did not leave a stamp is accepted
+        # as-is; its inputs cannot be compared against anything.
+        if not stamp_file.exists() and xml_dir.is_dir() and any(os.scandir(xml_dir)):
+            return
+
+        # Collect the modification times of all of doxygen's input files.
+        input_mtimes = [os.path.getmtime(CONF_DIR / "Doxyfile")]
+        for dirpath, _dirnames, filenames in os.walk(REPO_ROOT / "src"):
+            for filename in filenames:
+                if filename.endswith((".c", ".h")):
+                    input_mtimes.append(
+                        os.path.getmtime(os.path.join(dirpath, filename))
+                    )
+
+        # Nothing changed since the last run, the existing XML is still valid.
+        if stamp_file.exists() and max(input_mtimes) <= os.path.getmtime(stamp_file):
+            return
+
     try:
-        retcode = subprocess.call("cd ../../; doxygen docs/source/Doxyfile", shell=True)
+        retcode = subprocess.run(
+            ["doxygen", "docs/source/Doxyfile"], cwd=REPO_ROOT, check=False
+        ).returncode
         if retcode < 0:
-            sys.stderr.write(
-                "[FAIL] doxygen terminated by signal {}\n".format(-retcode)
-            )
+            sys.stderr.write(f"[FAIL] doxygen terminated by signal {-retcode}\n")
+        elif retcode == 0:
+            # Touch the stamp file to mark this run's inputs as processed.
+            stamp_file.parent.mkdir(parents=True, exist_ok=True)
+            stamp_file.touch()
     except OSError as e:
-        sys.stderr.write("[FAIL] doxygen execution failed: {}\n".format(e))
+        sys.stderr.write(f"[FAIL] doxygen execution failed: {e}\n")
 
 
 def read_version_from_file():
-    with open(os.path.join(os.path.abspath("../../"), "version.txt"), "r") as f:
-        version = f.read().rstrip()
+    """Read the project's version from ``version.txt``.
+
+    Returns a tuple of the short ``MAJOR.MINOR`` version and the full version
+    string. Sphinx includes ``version`` in the hash of its configuration, so
+    keeping it stable across commits (no pre-release or dev suffixes) keeps
+    the doctree cache valid and rebuilds incremental; the full string is only
+    exposed as ``release``.
+    """
 
-    return version
+    full_version = (REPO_ROOT / "version.txt").read_text().rstrip()
+
+    short_version = re.match(r"(\d+\.\d+)", full_version).group(1)
+
+    return short_version, full_version
 
 
 # ### Project Information
 
 project = "KrachkisteESP32"
 author = "Mischback"
-copyright = "{}, {}".format(datetime.datetime.now().year, author)
-version = read_version_from_file()
-release = version
+
+# Honour SOURCE_DATE_EPOCH (the reproducible-builds convention) when
+# determining the copyright year, so repeated builds of the same sources
+# produce byte-identical HTML and stay cacheable downstream.
+copyright_year = datetime.datetime.fromtimestamp(
+    int(os.environ.get("SOURCE_DATE_EPOCH", time.time())),
+    tz=datetime.timezone.utc,
+).year
+copyright = "{}, {}".format(copyright_year, author)
+version, release = read_version_from_file()
 
 
 # ### General Configuration
@@ -54,8 +118,6 @@ exclude_patterns = []
 
 # activate extensions
 extensions = [
-    # automatically insert labels for section titles
-    "sphinx.ext.autosectionlabel",
     # make links to other, often referenced, sites easier
     "sphinx.ext.extlinks",
     # provide links to other, sphinx-generated, documentation
@@ -81,16 +143,16 @@ source_suffix = {
 
 # ### Extension Configuration
 
-# ##### autosectionlabel
-autosectionlabel_prefix_document = True
-autosectionlabel_maxdepth = 2
-
-
 # ##### intersphinx
 
 python_version = ".".join(map(str, sys.version_info[0:2]))
 intersphinx_mapping = {
-    "python": ("https://docs.python.org/" + python_version, None),
+    "python": (
+        "https://docs.python.org/" + python_version,
+        # the locally cached inventory is tried first, the remote one is the
+        # fallback (see ``prefetch_intersphinx_inventories()`` below)
+        (str(CONF_DIR / "_inv" / "python-objects.inv"), None),
+    ),
     # if the doc is hosted on RTD, the following should work out of the box:
     # "celery": ("https://celery.readthedocs.org/en/latest/", None),
 }
@@ -99,6 +161,51 @@ intersphinx_mapping = {
 intersphinx_cache_limit = 90  # days
 
 
+def prefetch_intersphinx_inventories():
+    """Download the remote ``objects.inv`` files into a local cache.
+
+    The cached copies are the first fallback location in
+    ``intersphinx_mapping``, so builds do not block on network round-trips
+    (and keep working offline) while the cache is fresh. Inventories are only
+    re-fetched if the local copy is missing or older than
+    ``intersphinx_cache_limit`` days, and all fetches run concurrently, so
+    the cold-build cost is the slowest fetch instead of the sum of all.
+    """
+
+    def fetch(url, target):
+        try:
+            with urllib.request.urlopen(url + "/objects.inv", timeout=10) as response:
+                data = response.read()
+        except OSError:
+            # Network failures must not fail the build; intersphinx falls
+            # back to the remote inventory (or a stale local copy).
+            return
+        # Only create the cache directory for an actually successful fetch,
+        # so failed (e.g. offline) runs do not litter the source tree.
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+
+    max_age = intersphinx_cache_limit * 24 * 60 * 60
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        for url, fallbacks in intersphinx_mapping.values():
+            # Only entries declaring a local cache location are prefetched;
+            # plain ``None`` inventories (the default remote-only form) are
+            # left entirely to intersphinx.
+            if not isinstance(fallbacks, tuple):
+                continue
+            target = fallbacks[0]
+            if (
+                os.path.exists(target)
+                and time.time() - os.path.getmtime(target) < max_age
+            ):
+                continue
+            executor.submit(fetch, url, target)
+
+
+prefetch_intersphinx_inventories()
+
+
 # ##### extlinks
 extlinks = {
     # will show commit's SHA1
@@ -121,11 +228,7 @@ extlinks = {
 }
 
 # ##### breath
-breathe_projects = {
-    "Krachkiste_ESP32": os.path.join(
-        os.path.abspath(os.path.dirname(__file__)), "doxygen", "xml"
-    )
-}
+breathe_projects = {"Krachkiste_ESP32": str(CONF_DIR / "doxygen" / "xml")}
 breathe_default_project = "Krachkiste_ESP32"
 
 # ### HTML Output
@@ -153,6 +256,17 @@ html_theme_options = {
 # https://www.sphinx-doc.org/en/master/usage/configuration.html#confval-html_static_path
 html_static_path = ["_static"]
 
+# Do **not** copy the reST sources into the output's ``_sources/`` directory.
+# The sources are available in the repository anyway (see the ``source`` role
+# of ``extlinks``), and skipping the copy cuts one written file per document
+# from the write phase (and one input per document from the HTML minimizer).
+# https://www.sphinx-doc.org/en/master/usage/configuration.html#confval-html_copy_source
+html_copy_source = False
+
+# Without the copied sources, the "View page source" links would be dead.
+# https://www.sphinx-doc.org/en/master/usage/configuration.html#confval-html_show_sourcelink
+html_show_sourcelink = False
+
 # provide a logo (max 200px width)
 # html_logo = ""
 
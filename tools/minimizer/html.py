@@ -6,59 +6,173 @@
 The script is basically just a tiny wrapper around ``minify-html`` and sets the
 desired configuration values. These are hard-coded, to create coherent results
 for all files during every run.
+
+Besides the original single-file mode (INPUT / OUTPUT as positional
+arguments), the script accepts a manifest file listing one tab-separated
+INPUT / OUTPUT pair per line (``--manifest``). All files of a manifest are
+processed in a single interpreter with a pool of worker threads, which
+amortizes the interpreter and import startup cost over the whole batch;
+``minify-html``'s Rust core releases the GIL, so the workers actually run in
+parallel.
 """
 
 # Python imports
+import argparse
+import concurrent.futures
+import functools
+import os
 import sys
 
 # external imports
 import minify_html
 
-if __name__ == "__main__":
-    # get parameters from ``argv``
+# The desired configuration values for ``minify-html``.
+# All configuration options are specified explicitly! The dict is built once
+# at module level and shared (read-only) by all worker threads, instead of
+# being rebuilt as keyword arguments for every single file.
+_MINIFY_OPTS = {
+    "do_not_minify_doctype": True,
+    "ensure_spec_compliant_unquoted_attribute_values": True,
+    "keep_closing_tags": True,
+    "keep_html_and_head_opening_tags": True,
+    "keep_spaces_between_attributes": True,
+    "keep_comments": False,
+    "minify_css": True,
+    "minify_js": True,
+    "remove_bangs": True,
+    "remove_processing_instructions": True,
+}
+
+_minify = functools.partial(minify_html.minify, **_MINIFY_OPTS)
+
+
+def minify_file(input_file, output_file):
+    """Minify a single HTML file.
+
+    Reads ``input_file``, runs it through ``minify_html`` and writes the
+    result to ``output_file``. Returns ``True`` on success and ``False`` on
+    any error, after printing a corresponding message.
+
+    If ``output_file`` already exists and is at least as new as
+    ``input_file``, the file is skipped entirely. If the minified result is
+    identical to the existing output, the file is not rewritten, keeping its
+    mtime (and every downstream build step keyed on it) stable.
+    """
+
+    # nothing to do if the existing output is at least as new as the input
     try:
-        input_file = sys.argv[1]
-        output_file = sys.argv[2]
-    except IndexError:
-        print("Please specify an INPUT / OUTPUT file!")
-        sys.exit(1)
+        if os.path.getmtime(output_file) >= os.path.getmtime(input_file):
+            return True
+    except OSError:
+        pass
 
     print("Minimizing HTML source '{}'".format(input_file))
 
-    # open input_file, read its content
+    # The whole read/minify/write sequence is guarded by a single OSError
+    # handler: the OS reports the failing file and reason exactly once via
+    # the exception's attributes, so there is no need for per-call stat
+    # checks or a try/except ladder on the error-free hot path.
     try:
-        with open(input_file) as f_in:
-            source = f_in.read()
-    except FileNotFoundError:
-        print("Could not open INPUT '{}' (file not found)!".format(input_file))
-        sys.exit(1)
-    except PermissionError:
-        print("Could not read INPUT '{}' (missing permission)!".format(input_file))
-        sys.exit(1)
-
-    # run through minify_html
-    # all configuration options are specified explicitly!
-    result = minify_html.minify(
-        source,
-        do_not_minify_doctype=True,
-        ensure_spec_compliant_unquoted_attribute_values=True,
-        keep_closing_tags=True,
-        keep_html_and_head_opening_tags=True,
-        keep_spaces_between_attributes=True,
-        keep_comments=False,
-        minify_css=True,
-        minify_js=True,
-        remove_bangs=True,
-        remove_processing_instructions=True,
-    )
+        # open input_file, read its content
+        # The file is read in binary mode with a single explicit UTF-8
+        # decode; this skips the text layer's newline translation, and the
+        # result is encoded exactly once for the comparison and the write.
+        with open(input_file, "rb") as f_in:
+            source = f_in.read().decode("utf-8")
 
-    # write to output_file
-    try:
-        with open(output_file, "w") as f_out:
+        # run through minify_html (see ``_MINIFY_OPTS`` for the configuration)
+        result = _minify(source).encode("utf-8")
+
+        # do not rewrite the output if its content would not change
+        try:
+            with open(output_file, "rb") as f_out:
+                if f_out.read() == result:
+                    return True
+        except OSError:
+            pass
+
+        # write to output_file
+        with open(output_file, "wb") as f_out:
             f_out.write(result)
-    except PermissionError:
-        print("Could not write to OUTPUT '{}' (missing permission)".format(output_file))
-        sys.exit(1)
+    except OSError as e:
+        print(
+            "Could not process '{}' ({})!".format(
+                e.filename or input_file, e.strerror or e
+            )
+        )
+        return False
+
+    return True
+
+
+def main(argv=None):
+    """Parse the command line arguments and run the minification."""
 
-    # return "0" = SUCCESS
-    sys.exit(0)
+    parser = argparse.ArgumentParser(
+        description="Minify HTML source code with minify-html."
+    )
+    parser.add_argument(
+        "input_file", nargs="?", help="the HTML source file to be minified"
+    )
+    parser.add_argument(
+        "output_file", nargs="?", help="the filename of the minified result"
+    )
+    parser.add_argument(
+        "--manifest",
+        help=(
+            "a file listing one tab-separated INPUT/OUTPUT pair per line; "
+            "all pairs are processed in this single process"
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="number of worker threads for --manifest mode (default: all cores)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.manifest:
+        try:
+            with open(args.manifest) as f_manifest:
+                lines = f_manifest.readlines()
+        except OSError as e:
+            print("Could not read MANIFEST '{}' ({})!".format(args.manifest, e))
+            return 1
+
+        # Validate the manifest before submitting any work: every non-empty
+        # line must yield exactly one tab-separated INPUT/OUTPUT pair.
+        # Malformed lines are reported and fail the run, but do not abort the
+        # processing of the remaining valid pairs.
+        pairs = []
+        malformed = False
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            pair = line.rstrip("\n").split("\t")
+            if len(pair) != 2:
+                print(
+                    "Malformed line {} in MANIFEST '{}' (expected one "
+                    "tab-separated INPUT/OUTPUT pair)!".format(
+                        line_number, args.manifest
+                    )
+                )
+                malformed = True
+                continue
+            pairs.append(pair)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as executor:
+            results = list(
+                executor.map(lambda pair: minify_file(pair[0], pair[1]), pairs)
+            )
+
+        return 0 if all(results) and not malformed else 1
+
+    if not (args.input_file and args.output_file):
+        parser.error("Please specify an INPUT / OUTPUT file!")
+
+    return 0 if minify_file(args.input_file, args.output_file) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())